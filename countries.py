@@ -0,0 +1,35 @@
+# Country tables shared by the export pipeline and the GUI.
+# Kept free of heavy imports so the GUI can build its widgets before pandas is loaded.
+
+# Countries in sheet order, with the MapCodes that belong to each of them
+COUNTRIES = ["CZ", "DE", "PL", "AT", "SK"]
+RESERVE_MAPCODES = {
+    "CZ": ["CZ", "CZ-CEPS", "CZ_CEPS", "CZ_CEPS_SCA"],
+    "DE": ["DE_TransnetBW_SCA", "DE_TransnetBW", "DE_50HzT", "DE_TenneT_GER", "DE_Amprion", "DE", "DE-LU", "DE_LU"],
+    "PL": ["PL"],
+    "AT": ["AT", "AT-APG", "AT_APG", "AT_APG_SCA"],
+    "SK": ["SK", "SK-SEPS", "SK_SEPS", "SK_SEPS_SCA"],
+}
+ENERGY_MAPCODES = {
+    "CZ": ["CZ"],
+    "DE": ["DE_TransnetBW", "DE", "DE-LU", "DE_LU", "DE_50HzT", "DE_TenneT_GER", "DE_Amprion"],
+    "PL": ["PL"],
+    "AT": ["AT"],
+    "SK": ["SK"],
+}
+# Reserves: (TimeHorizon, TypeOfProduct); None means the product must be missing (NaN)
+RESERVE_RULES = {
+    "CZ": ("Daily", "Standard"),
+    "DE": ("Daily", "Standard"),
+    "PL": ("Hourly", None),
+    "AT": ("Daily", "Standard"),
+    "SK": ("Daily", "Standard"),
+}
+# Energy: TypeOfProduct per country
+ENERGY_PRODUCTS = {
+    "CZ": "Standard",
+    "DE": "Standard",
+    "PL": "Not Specified",
+    "AT": "Standard",
+    "SK": "Specific",
+}
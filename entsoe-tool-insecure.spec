@@ -9,7 +9,7 @@ a = Analysis(
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
-    runtime_hooks=['hooks\\pyi_rth_disable_verify.py'],
+    runtime_hooks=['hooks\\pyi_rth_startup_timer.py', 'hooks\\pyi_rth_disable_verify.py'],
     excludes=[],
     noarchive=False,
     optimize=0,
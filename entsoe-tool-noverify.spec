@@ -9,7 +9,7 @@ a = Analysis(
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
-    runtime_hooks=['hooks\\pyi_rth_requests_noverify.py'],
+    runtime_hooks=['hooks\\pyi_rth_startup_timer.py', 'hooks\\pyi_rth_requests_noverify.py'],
     excludes=[],
     noarchive=False,
     optimize=0,
@@ -9,7 +9,7 @@ a = Analysis(
     hiddenimports=['pip_system_certs', 'wincertstore', 'certifi_win32'],
     hookspath=[],
     hooksconfig={},
-    runtime_hooks=['hooks\\pyi_rth_proxy_autoconfig.py', 'hooks\\pyi_rth_certifi_win32.py', 'hooks\\pyi_rth_pip_system_certs.py', 'hooks\\pyi_rth_requests_certifi_env.py'],
+    runtime_hooks=['hooks\\pyi_rth_startup_timer.py', 'hooks\\pyi_rth_proxy_autoconfig.py', 'hooks\\pyi_rth_certifi_win32.py', 'hooks\\pyi_rth_pip_system_certs.py', 'hooks\\pyi_rth_requests_certifi_env.py'],
     excludes=[],
     noarchive=False,
     optimize=0,
@@ -9,7 +9,7 @@ a = Analysis(
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
-    runtime_hooks=['hooks\\pyi_rth_certifi_win32.py', 'hooks\\pyi_rth_pip_system_certs.py'],
+    runtime_hooks=['hooks\\pyi_rth_startup_timer.py', 'hooks\\pyi_rth_certifi_win32.py', 'hooks\\pyi_rth_pip_system_certs.py'],
     excludes=[],
     noarchive=False,
     optimize=0,
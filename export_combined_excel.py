@@ -1,63 +1,169 @@
+import numpy as np
 import pandas as pd
 import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from countries import COUNTRIES, ENERGY_MAPCODES, ENERGY_PRODUCTS, RESERVE_MAPCODES, RESERVE_RULES
+from rollups import RollupEngine
 
 def _next_month(dt: datetime) -> datetime:
     if dt.month == 12:
         return datetime(dt.year + 1, 1, 1)
     return datetime(dt.year, dt.month + 1, 1)
 
-def export_combined_excel(folder_path, period_start: datetime | None = None, period_end: datetime | None = None):
+# Downloads may be stored plain or compressed; pandas infers the codec from the suffix
+CSV_SUFFIXES = (".csv", ".csv.gz", ".csv.zst")
+
+MONTH_KEY_RE = re.compile(r"(\d{4})_(\d{2})")
+
+def _month_keys_for(start_bound: datetime, end_exclusive: datetime):
+    # YYYY_MM keys of the period, widened by one month on each side because the monthly
+    # files follow local time and may hold a few UTC hours of the neighbouring month
+    month = datetime(start_bound.year - 1, 12, 1) if start_bound.month == 1 else datetime(start_bound.year, start_bound.month - 1, 1)
+    keys = set()
+    while month <= end_exclusive:
+        keys.add(month.strftime("%Y_%m"))
+        month = _next_month(month)
+    return keys
+
+def _list_data_files(folder_path, keyword, month_keys=None):
+    # One path per logical file: if both plain and compressed copies exist, keep the newest.
+    # With month_keys, files named for other months are skipped without being parsed;
+    # files without a YYYY_MM key in their name are always kept.
+    by_base = {}
+    for f in os.listdir(folder_path):
+        if keyword not in f:
+            continue
+        suffix = next((s for s in CSV_SUFFIXES if f.endswith(s)), None)
+        if suffix is None:
+            continue
+        if month_keys is not None:
+            key = MONTH_KEY_RE.search(f)
+            if key and key.group(0) not in month_keys:
+                continue
+        path = os.path.join(folder_path, f)
+        base = f[: -len(suffix)]
+        if base not in by_base or os.path.getmtime(path) > os.path.getmtime(by_base[base]):
+            by_base[base] = path
+    return sorted(by_base.values())
+
+def _normalize_countries(countries):
+    if countries is None:
+        return list(COUNTRIES)
+    wanted = {c.upper() for c in countries}
+    unknown = wanted - set(COUNTRIES)
+    if unknown:
+        raise ValueError(f"Neznámé země: {', '.join(sorted(unknown))}")
+    return [c for c in COUNTRIES if c in wanted]
+
+def export_combined_excel(folder_path, period_start: datetime | None = None, period_end: datetime | None = None,
+                          countries=None, workers: int | None = None, split_by_country: bool = False):
+    # Only the requested countries are parsed, aggregated, merged and written.
+    # With split_by_country, workers > 1 builds and writes each country's workbook in its own process.
+    # A single openpyxl workbook can only be written by one process, and building the tables takes
+    # milliseconds next to to_excel, so the combined workbook is always produced serially.
+    # Returns the workbook path, or a list of per-country paths when split_by_country is set.
+    countries = _normalize_countries(countries)
     # Normalize month bounds if provided: [start, end_exclusive)
     start_bound = end_exclusive = None
     if period_start is not None and period_end is not None:
         start_bound = datetime(period_start.year, period_start.month, 1)
         end_exclusive = _next_month(datetime(period_end.year, period_end.month, 1))
 
-    reserves_cz, reserves_de, reserves_pl, reserves_at, reserves_sk = get_reserves_dfs(folder_path, start_bound, end_exclusive)
-    energy_cz, energy_de, energy_pl, energy_at, energy_sk = get_energy_dfs(folder_path, start_bound, end_exclusive)
+    reserves = get_reserves_dfs(folder_path, start_bound, end_exclusive, countries)
+    energy = get_energy_dfs(folder_path, start_bound, end_exclusive, countries)
 
-    if all(df.empty for df in [
-        reserves_cz, reserves_de, reserves_pl, reserves_at, reserves_sk,
-        energy_cz, energy_de, energy_pl, energy_at, energy_sk
-    ]):
+    if all(df.empty for df in reserves + energy):
         return None
 
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M")
     output_path = os.path.join(folder_path, f"regulacni_zalohy_a_energie_{timestamp}.xlsx")
 
+    # Dense hourly grid over the requested period, without padding hours that cannot have data yet
+    grid_start = grid_end = None
+    if start_bound is not None:
+        grid_start = start_bound
+        grid_end = clipped_grid_end(end_exclusive, *reserves, *energy)
+
+    jobs = [
+        (code, res_df, en_df, grid_start, grid_end)
+        for code, res_df, en_df in zip(countries, reserves, energy)
+        if not res_df.empty or not en_df.empty
+    ]
+
+    if split_by_country:
+        paths = [os.path.join(folder_path, f"regulacni_zalohy_a_energie_{code}_{timestamp}.xlsx") for code, *_ in jobs]
+        args = [(path, *job) for path, job in zip(paths, jobs)]
+        _run_jobs(_write_country_workbook, args, workers)
+        return paths
+
     with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-        for code, res_df, en_df in [
-            ("CZ", reserves_cz, energy_cz),
-            ("DE", reserves_de, energy_de),
-            ("PL", reserves_pl, energy_pl),
-            ("AT", reserves_at, energy_at),
-            ("SK", reserves_sk, energy_sk),
+        for sheets in (_build_country_sheets(*job) for job in jobs):
+            for sheet_name, df in sheets:
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+
+    return output_path
+
+def _run_jobs(func, jobs, workers):
+    if not workers or workers <= 1 or len(jobs) <= 1:
+        return [func(*job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(func, *zip(*jobs)))
+
+def _build_country_sheets(code, res_df, en_df, grid_start=None, grid_end=None):
+    # Merged hourly table plus its daily/weekly/monthly rollups for one country
+    merged = merge_tables(res_df, en_df, grid_start, grid_end)
+    if merged.empty:
+        merged = res_df if not res_df.empty else en_df
+    return country_sheets(code, merged)
+
+def country_sheets(code, merged):
+    sheets = [(code, merged)]
+    if not merged.empty and "ISP(UTC)" in merged.columns:
+        rollups = RollupEngine()
+        rollups.update(code, merged)
+        for level, sheet_suffix in [
+            ("day", "denní průměry"),
+            ("week", "týdenní průměry"),
+            ("month", "měsíční průměry"),
         ]:
-            if not res_df.empty or not en_df.empty:
-                merged = merge_tables(res_df, en_df)
-                if merged.empty:
-                    merged = res_df if not res_df.empty else en_df
-                merged.to_excel(writer, sheet_name=code, index=False)
-                if not merged.empty and "ISP(UTC)" in merged.columns:
-                    daily_avg = compute_daily_averages(merged)
-                    daily_avg.to_excel(writer, sheet_name=f"{code} - denní průměry", index=False)
+            sheets.append((f"{code} - {sheet_suffix}", rollups.averages(code, level)))
+    return sheets
 
+def write_merged_workbook(output_path, merged_by_country):
+    # Writes already merged hourly tables (country -> DataFrame) atomically: readers of
+    # output_path see either the previous workbook or the complete new one.
+    merged_by_country = {code: merged for code, merged in merged_by_country.items() if not merged.empty}
+    if not merged_by_country:
+        return None
+    tmp_path = output_path + ".tmp.xlsx"
+    with pd.ExcelWriter(tmp_path, engine="openpyxl") as writer:
+        for code, merged in merged_by_country.items():
+            for sheet_name, df in country_sheets(code, merged):
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+    os.replace(tmp_path, output_path)
     return output_path
 
-def get_reserves_dfs(folder_path, start_bound: datetime | None = None, end_exclusive: datetime | None = None):
+def _write_country_workbook(path, code, res_df, en_df, grid_start=None, grid_end=None):
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        for sheet_name, df in _build_country_sheets(code, res_df, en_df, grid_start, grid_end):
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+    return path
+
+def get_reserves_dfs(folder_path, start_bound: datetime | None = None, end_exclusive: datetime | None = None,
+                     countries=None):
+    # Returns one hourly table per requested country, in COUNTRIES order.
     # New ENTSO-E schema introduces AreaMapCode and InstanceCode.
     # Read header from file (robust to both old and new schemas) and normalize.
+    countries = _normalize_countries(countries)
     wanted_reserve_types = {
         "Manual Frequency Restoration Reserve (mFRR)",
         "Automatic Frequency Restoration Reserve (aFRR)",
         "Frequency Containment Reserve (FCR)"
     }
-    file_names = [
-        f for f in os.listdir(folder_path)
-        if "AmountAndPricesPaidOfBalancingReservesUnderContract" in f and f.endswith(".csv")
-    ]
-    file_paths = [os.path.join(folder_path, f) for f in file_names]
+    month_keys = _month_keys_for(start_bound, end_exclusive) if start_bound is not None and end_exclusive is not None else None
+    file_paths = _list_data_files(folder_path, "AmountAndPricesPaidOfBalancingReservesUnderContract", month_keys)
     df_list = []
 
     for file in file_paths:
@@ -71,26 +177,21 @@ def get_reserves_dfs(folder_path, start_bound: datetime | None = None, end_exclu
             }
             df.rename(columns={k: v for k, v in rename_map.items() if k in df.columns}, inplace=True)
 
-            # Filter wanted reserve types and countries with their respective rules
+            # Filter wanted reserve types and requested countries with their respective rules
             # TypeOfProduct logic reverted to original behavior:
-            # - CZ/DE/AT: require "Standard"
-            # - PL:       missing (NaN)
-            cz_codes = ["CZ", "CZ-CEPS", "CZ_CEPS", "CZ_CEPS_SCA"]
-            de_codes = ["DE_TransnetBW_SCA", "DE_TransnetBW", "DE_50HzT", "DE_TenneT_GER", "DE_Amprion", "DE", "DE-LU", "DE_LU"]
-            at_codes = ["AT", "AT-APG", "AT_APG", "AT_APG_SCA"]
-            sk_codes = ["SK", "SK-SEPS", "SK_SEPS", "SK_SEPS_SCA"]
-            df = df[
-                df["ReserveType"].isin(wanted_reserve_types) &
-                (
-                    ((df["AreaMapCode"].isin(cz_codes + de_codes + at_codes + sk_codes)) &
-                     (df["TimeHorizon"] == "Daily") &
-                     (df["TypeOfProduct"] == "Standard"))
-                    |
-                    ((df["AreaMapCode"] == "PL") &
-                     (df["TimeHorizon"] == "Hourly") &
-                     (df["TypeOfProduct"].isna()))
+            # - CZ/DE/AT/SK: Daily, require "Standard"
+            # - PL:          Hourly, missing (NaN)
+            # Rows of unrequested countries are dropped here, per file, before anything is concatenated.
+            country_mask = pd.Series(False, index=df.index)
+            for code in countries:
+                horizon, product = RESERVE_RULES[code]
+                product_mask = df["TypeOfProduct"].isna() if product is None else df["TypeOfProduct"] == product
+                country_mask |= (
+                    df["AreaMapCode"].isin(RESERVE_MAPCODES[code]) &
+                    (df["TimeHorizon"] == horizon) &
+                    product_mask
                 )
-            ]
+            df = df[df["ReserveType"].isin(wanted_reserve_types) & country_mask]
             df["ISP(UTC)"] = pd.to_datetime(df["ISP(UTC)"])
             if start_bound is not None and end_exclusive is not None:
                 df = df[(df["ISP(UTC)"] >= start_bound) & (df["ISP(UTC)"] < end_exclusive)]
@@ -100,17 +201,14 @@ def get_reserves_dfs(folder_path, start_bound: datetime | None = None, end_exclu
 
     if df_list:
         merged_df = pd.concat(df_list, ignore_index=True)
-        return (
-            aggregate_hourly(merged_df, ["CZ", "CZ-CEPS", "CZ_CEPS", "CZ_CEPS_SCA"]),
-            aggregate_hourly(merged_df, ["DE_TransnetBW_SCA", "DE_TransnetBW", "DE_50HzT", "DE_TenneT_GER", "DE_Amprion", "DE", "DE-LU", "DE_LU"]),
-            aggregate_hourly(merged_df, ["PL"]),
-            aggregate_hourly(merged_df, ["AT", "AT-APG", "AT_APG", "AT_APG_SCA"]),
-            aggregate_hourly(merged_df, ["SK", "SK-SEPS", "SK_SEPS", "SK_SEPS_SCA"]),
-        )
+        return tuple(aggregate_hourly(merged_df, RESERVE_MAPCODES[code]) for code in countries)
     else:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+        return tuple(pd.DataFrame() for _ in countries)
 
-def get_energy_dfs(folder_path, start_bound: datetime | None = None, end_exclusive: datetime | None = None):
+def get_energy_dfs(folder_path, start_bound: datetime | None = None, end_exclusive: datetime | None = None,
+                   countries=None):
+    # Returns one hourly table per requested country, in COUNTRIES order.
+    countries = _normalize_countries(countries)
     column_names = [
         "ISP(UTC)", "ResolutionCode", "AreaCode", "AreaDisplayName", "AreaTypeCode",
         "MapCode", "ReserveType", "TypeOfProduct",
@@ -121,27 +219,21 @@ def get_energy_dfs(folder_path, start_bound: datetime | None = None, end_exclusi
         "Manual Frequency Restoration Reserve (mFRR)",
         "Automatic Frequency Restoration Reserve (aFRR)"
     }
-    file_names = [
-        f for f in os.listdir(folder_path)
-        if "PricesOfActivatedBalancingEnergy" in f and f.endswith(".csv")
-    ]
-    file_paths = [os.path.join(folder_path, f) for f in file_names]
+    month_keys = _month_keys_for(start_bound, end_exclusive) if start_bound is not None and end_exclusive is not None else None
+    file_paths = _list_data_files(folder_path, "PricesOfActivatedBalancingEnergy", month_keys)
     df_list = []
 
     for file in file_paths:
         try:
             df = pd.read_csv(file, sep="\t", names=column_names, header=None, skiprows=1)
-            df = df[
-                df["ReserveType"].isin(wanted_reserve_types) &
-                (
-                    ((df["MapCode"].isin(["CZ", "DE_TransnetBW", "DE", "DE-LU", "DE_LU", "DE_50HzT", "DE_TenneT_GER", "DE_Amprion", "AT"])) &
-                     (df["TypeOfProduct"] == "Standard"))
-                    |
-                    ((df["MapCode"] == "PL") & (df["TypeOfProduct"] == "Not Specified"))
-                    |
-                    ((df["MapCode"] == "SK") & (df["TypeOfProduct"] == "Specific"))
+            # Rows of unrequested countries are dropped here, per file, before anything is concatenated.
+            country_mask = pd.Series(False, index=df.index)
+            for code in countries:
+                country_mask |= (
+                    df["MapCode"].isin(ENERGY_MAPCODES[code]) &
+                    (df["TypeOfProduct"] == ENERGY_PRODUCTS[code])
                 )
-            ]
+            df = df[df["ReserveType"].isin(wanted_reserve_types) & country_mask]
             df["ISP(UTC)"] = pd.to_datetime(df["ISP(UTC)"])
             if start_bound is not None and end_exclusive is not None:
                 df = df[(df["ISP(UTC)"] >= start_bound) & (df["ISP(UTC)"] < end_exclusive)]
@@ -151,15 +243,9 @@ def get_energy_dfs(folder_path, start_bound: datetime | None = None, end_exclusi
 
     if df_list:
         merged_df = pd.concat(df_list, ignore_index=True)
-        return (
-            reshape_energy_data(merged_df, ["CZ"]),
-            reshape_energy_data(merged_df, ["DE_TransnetBW", "DE", "DE-LU", "DE_LU", "DE_50HzT", "DE_TenneT_GER", "DE_Amprion", "DE(Amprion)_LU"]),
-            reshape_energy_data(merged_df, ["PL"]),
-            reshape_energy_data(merged_df, ["AT"]),
-            reshape_energy_data(merged_df, ["SK"]),
-        )
+        return tuple(reshape_energy_data(merged_df, ENERGY_MAPCODES[code]) for code in countries)
     else:
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+        return tuple(pd.DataFrame() for _ in countries)
 
 
 def get_energy_dfs2(folder_path, start_bound: datetime | None = None, end_exclusive: datetime | None = None):
@@ -173,11 +259,8 @@ def get_energy_dfs2(folder_path, start_bound: datetime | None = None, end_exclus
         "Manual Frequency Restoration Reserve (mFRR)",
         "Automatic Frequency Restoration Reserve (aFRR)"
     }
-    file_names = [
-        f for f in os.listdir(folder_path)
-        if "PricesOfActivatedBalancingEnergy" in f and f.endswith(".csv")
-    ]
-    file_paths = [os.path.join(folder_path, f) for f in file_names]
+    month_keys = _month_keys_for(start_bound, end_exclusive) if start_bound is not None and end_exclusive is not None else None
+    file_paths = _list_data_files(folder_path, "PricesOfActivatedBalancingEnergy", month_keys)
     df_list = []
 
     for file in file_paths:
@@ -225,11 +308,8 @@ def get_energy_dfs3(folder_path, start_bound: datetime | None = None, end_exclus
         "LoadUpPrice", "LoadDownPrice", "GenerationUpPrice", "GenerationDownPrice",
         "NotSpecifiedUpPrice", "NotSpecifiedDownPrice", "PriceType", "Currency", "UpdateTime"
     ]
-    file_names = [
-        f for f in os.listdir(folder_path)
-        if "PricesOfActivatedBalancingEnergy" in f and f.endswith(".csv")
-    ]
-    file_paths = [os.path.join(folder_path, f) for f in file_names]
+    month_keys = _month_keys_for(start_bound, end_exclusive) if start_bound is not None and end_exclusive is not None else None
+    file_paths = _list_data_files(folder_path, "PricesOfActivatedBalancingEnergy", month_keys)
     df_list = []
 
     for file in file_paths:
@@ -351,25 +431,52 @@ def reshape_energy_data(df, mapcodes):
     df_combined.fillna(0, inplace=True)
     return df_combined
 
-def merge_tables(df_reserves, df_energy):
-    if df_reserves.empty and not df_energy.empty:
-        return df_energy.copy()
-    if df_energy.empty and not df_reserves.empty:
-        return df_reserves.copy()
-    if df_reserves.empty and df_energy.empty:
+def hourly_grid(start: datetime, end_exclusive: datetime) -> pd.DatetimeIndex:
+    # By period count: date_range(start, start, inclusive="left") would still yield one hour
+    periods = max(0, (pd.Timestamp(end_exclusive) - pd.Timestamp(start)) // pd.Timedelta(hours=1))
+    return pd.date_range(start, periods=periods, freq="h", name="ISP(UTC)")
+
+def clipped_grid_end(end_exclusive: datetime, *dfs) -> datetime:
+    # Grid end for a period that may still be running: only the empty padding after both the
+    # current hour and the last published hour is dropped (daily reserves run a day ahead).
+    end = pd.Timestamp.now("UTC").tz_localize(None).floor("h") + pd.Timedelta(hours=1)
+    for df in dfs:
+        if not df.empty and "ISP(UTC)" in df.columns:
+            end = max(end, pd.to_datetime(df["ISP(UTC)"]).max().floor("h") + pd.Timedelta(hours=1))
+    return min(pd.Timestamp(end_exclusive), end)
+
+def merge_tables(df_reserves, df_energy, start_bound: datetime | None = None, end_exclusive: datetime | None = None):
+    # Assemble onto a preallocated, sorted hourly grid: each series is written into its
+    # slot by position, so there is no join/sort and hours without data stay as NaN rows.
+    frames = [df for df in (df_reserves, df_energy) if not df.empty and "ISP(UTC)" in df.columns]
+    if not frames:
         return pd.DataFrame()
-    merged = pd.merge(df_reserves, df_energy, on="ISP(UTC)", how="outer", suffixes=('_RES', '_ENE'))
-    merged = merged.sort_values("ISP(UTC)").reset_index(drop=True)
-    return merged
+    if start_bound is None or end_exclusive is None:
+        hours = pd.concat([pd.to_datetime(df["ISP(UTC)"]).dt.floor("h") for df in frames])
+        start_bound = hours.min() if start_bound is None else start_bound
+        end_exclusive = hours.max() + pd.Timedelta(hours=1) if end_exclusive is None else end_exclusive
+    grid = hourly_grid(start_bound, end_exclusive)
+    n = len(grid)
+
+    value_cols = [[c for c in df.columns if c != "ISP(UTC)"] for df in frames]
+    shared = set(value_cols[0]) & set(value_cols[1]) if len(frames) == 2 else set()
+    suffixes = ["_RES", "_ENE"] if len(frames) == 2 else [""]
+
+    columns = {"ISP(UTC)": grid}
+    for df, cols, suffix in zip(frames, value_cols, suffixes):
+        hours = pd.to_datetime(df["ISP(UTC)"]).dt.floor("h")
+        # Offsets from the grid start; with an empty grid every row falls outside
+        pos = ((hours - pd.Timestamp(start_bound)) // pd.Timedelta(hours=1)).to_numpy()
+        inside = (pos >= 0) & (pos < n)
+        block = np.full((n, len(cols)), np.nan)
+        block[pos[inside]] = df.loc[inside, cols].to_numpy(dtype="float64")
+        for i, col in enumerate(cols):
+            columns[col + suffix if col in shared else col] = block[:, i]
+    return pd.DataFrame(columns)
 
 def compute_daily_averages(df):
-    df = df.copy()
     if "ISP(UTC)" not in df.columns:
         return pd.DataFrame()
-    df["DATE"] = pd.to_datetime(df["ISP(UTC)"]).dt.date
-    numeric_cols = [col for col in df.columns if col not in ["ISP(UTC)", "DATE"] and pd.api.types.is_numeric_dtype(df[col])]
-    if not numeric_cols:
-        return pd.DataFrame()
-    daily_avg = df.groupby("DATE")[numeric_cols].mean().reset_index()
-    daily_avg.rename(columns={"DATE": "Den"}, inplace=True)
-    return daily_avg
+    rollups = RollupEngine()
+    rollups.update("", df)
+    return rollups.averages("", "day")
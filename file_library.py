@@ -0,0 +1,303 @@
+# File Library client and settings, shared by the GUI (main.py) and the headless sync daemon.
+# Kept free of tkinter; requests and request_policy are imported on first use.
+import gzip
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urljoin
+
+import proxy_autoconfig
+
+SETTINGS_FILE = "settings.json"
+FMS_BASE_URL_DEFAULT = "https://fms.tp.entsoe.eu/"
+KEYCLOAK_TOKEN_URL = "https://keycloak.tp.entsoe.eu/realms/tp/protocol/openid-connect/token"
+USERNAME = "test"
+PASSWORD = "test"
+
+def load_settings():
+    default_download = os.path.join(os.path.expanduser("~"), "Downloads")
+    if os.path.exists(SETTINGS_FILE):
+        with open(SETTINGS_FILE, "r") as f:
+            return json.load(f)
+    return {
+        "host": FMS_BASE_URL_DEFAULT,
+        "username": USERNAME,
+        "password": PASSWORD,
+        "download_path": default_download,
+    }
+
+def save_settings(data):
+    with open(SETTINGS_FILE, "w") as f:
+        json.dump(data, f)
+
+def generate_month_keys(start_year, start_month, end_year, end_month):
+    try:
+        start = datetime(int(start_year), int(start_month), 1)
+        end = datetime(int(end_year), int(end_month), 1)
+    except ValueError:
+        return []
+    
+    keys = []
+    while start <= end:
+        keys.append(start.strftime("%Y_%m"))
+        if start.month == 12:
+            start = datetime(start.year + 1, 1, 1)
+        else:
+            start = datetime(start.year, start.month + 1, 1)
+    return keys
+
+
+def _get_bearer_token(username: str, password: str, timeout: int = 30) -> str:
+    import requests
+    data = {
+        "client_id": "tp-fms-public",
+        "grant_type": "password",
+        "username": username,
+        "password": password,
+    }
+    resp = requests.post(KEYCLOAK_TOKEN_URL, data=data, timeout=timeout)
+    resp.raise_for_status()
+    payload = resp.json()
+    return payload.get("access_token", "")
+
+
+def _list_folder(fms_base_url: str, token: str, path: str, page_size: int = 5000, timeout: int = 60):
+    import requests
+    url = urljoin(fms_base_url, "listFolder")
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
+    if not path.endswith("/"):
+        path = path + "/"
+    body = {
+        "path": path,
+        "sorterList": [
+            {"key": "periodCovered.from", "ascending": True}
+        ],
+        "pageInfo": {"pageIndex": 0, "pageSize": page_size},
+    }
+    resp = requests.post(url, headers=headers, json=body, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+# Local storage formats for downloaded CSVs; pandas infers the codec from the suffix on read
+COMPRESSION_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _open_compressed_writer(path: str, compression: str):
+    if compression == "gzip":
+        return gzip.open(path, "wb")
+    if compression == "zstd":
+        import zstandard  # optional dependency, only needed for zstd storage
+        return zstandard.ZstdCompressor(level=10).stream_writer(open(path, "wb"))
+    return open(path, "wb")
+
+
+def _write_response(r, path: str, compression: str):
+    if compression == "gzip" and r.headers.get("Content-Encoding", "").lower() == "gzip":
+        # Server already sent gzip: store the wire bytes as-is, no decode/re-encode round trip
+        with open(path, "wb") as f:
+            for chunk in r.raw.stream(1024 * 1024, decode_content=False):
+                if chunk:
+                    f.write(chunk)
+    else:
+        with _open_compressed_writer(path, compression) as f:
+            for chunk in r.iter_content(chunk_size=1024 * 1024):
+                if chunk:
+                    f.write(chunk)
+
+
+def _content_range_total(r):
+    # "bytes 0-0/12345" -> 12345; None when the size is unknown ("*") or the header is missing
+    value = r.headers.get("Content-Range", "")
+    total = value.rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+class _RangeNotHonored(Exception):
+    # A segment response did not match the requested byte range; the file is redone as one stream
+    pass
+
+
+def _download_segment(url: str, headers: dict, body: dict, start: int, end: int, path: str, timeout: int):
+    import requests
+    range_headers = {**headers, "Accept-Encoding": "identity", "Range": f"bytes={start}-{end}"}
+    expected = end - start + 1
+    with requests.post(url, headers=range_headers, json=body, stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        if r.status_code != 206 or not r.headers.get("Content-Range", "").startswith(f"bytes {start}-{end}/"):
+            raise _RangeNotHonored(f"Server nevrátil požadovaný rozsah {start}-{end}.")
+        written = 0
+        with open(path, "r+b") as f:
+            f.seek(start)
+            for chunk in r.iter_content(chunk_size=1024 * 1024):
+                if not chunk:
+                    continue
+                if written + len(chunk) > expected:
+                    # Never write past this segment into the next one's bytes
+                    f.write(chunk[:expected - written])
+                    raise _RangeNotHonored(f"Segment {start}-{end} je delší, než bylo požadováno.")
+                f.write(chunk)
+                written += len(chunk)
+    if written != expected:
+        # Truncated segment: retryable, only this range is fetched again
+        raise requests.exceptions.ChunkedEncodingError(f"Neúplný segment {start}-{end}: {written} B")
+
+
+def _download_segments(url: str, headers: dict, body: dict, total: int, segments: int, path: str, timeout: int,
+                       policy=None):
+    from request_policy import RequestPolicy
+    size = -(-total // segments)
+    ranges = [(start, min(start + size, total) - 1) for start in range(0, total, size)]
+    with open(path, "wb") as f:
+        f.truncate(total)  # preallocate, segments are written in place
+    # Segment retries report to the download's breaker and throttle signal, see RequestPolicy.child
+    policy = (policy or RequestPolicy()).child(len(ranges))
+    with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+        futures = [
+            pool.submit(policy.call, _download_segment, url, headers, body, start, end, path, timeout)
+            for start, end in ranges
+        ]
+        for future in futures:
+            future.result()
+    if os.path.getsize(path) != total:
+        raise IOError(f"Velikost souboru nesouhlasí: {os.path.getsize(path)} != {total} B")
+
+
+def _download_file_by_id(fms_base_url: str, token: str, file_id: str, local_path: str, timeout: int = 300,
+                         compression: str = "none", segments: int = 1, segment_min_bytes: int = 50 * 1024 * 1024,
+                         policy=None):
+    import requests
+    url = urljoin(fms_base_url, "downloadFileContent")
+    # Explicitly ask for a gzip-encoded transfer; requests transparently decodes it otherwise
+    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json", "Accept-Encoding": "gzip"}
+    body = {
+        "fileIdList": [file_id],
+        "topLevelFolder": "TP_export",
+        "downloadAsZip": False,
+    }
+    # Stream into a temp file so an interrupted attempt never leaves a truncated CSV behind
+    part_path = local_path + ".part"
+
+    if segments > 1:
+        # Probe for byte-range support; ranges apply to the plain (identity-encoded) content
+        probe_headers = {**headers, "Accept-Encoding": "identity", "Range": "bytes=0-0"}
+        with requests.post(url, headers=probe_headers, json=body, stream=True, timeout=timeout) as r:
+            r.raise_for_status()
+            total = _content_range_total(r) if r.status_code == 206 else None
+            if total is None:
+                # Ranges not supported: this response already is the full body, use it as the single stream
+                _write_response(r, part_path, compression)
+                os.replace(part_path, local_path)
+                return
+        if total >= segment_min_bytes:
+            try:
+                _download_segments(url, headers, body, total, segments, part_path, timeout, policy)
+            except _RangeNotHonored:
+                pass  # fall back to the single stream below, which overwrites the part file
+            else:
+                if compression != "none":
+                    with open(part_path, "rb") as src, _open_compressed_writer(part_path + ".z", compression) as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                    os.replace(part_path + ".z", part_path)
+                os.replace(part_path, local_path)
+                return
+
+    with requests.post(url, headers=headers, json=body, stream=True, timeout=timeout) as r:
+        r.raise_for_status()
+        _write_response(r, part_path, compression)
+    os.replace(part_path, local_path)
+
+
+def _item_fingerprint(item) -> str:
+    # Any change in the File Library metadata (modified time, size, id...) marks the file as changed
+    return json.dumps(item, sort_keys=True)
+
+
+def download_files_by_month(settings, remote_folder, pattern_keyword, month_keys, known_files: dict | None = None):
+    # known_files (name -> metadata fingerprint) enables incremental mode: files whose metadata is
+    # unchanged and which exist locally are skipped, and the dict is updated for downloaded files.
+    import requests
+    from request_policy import RequestPolicy
+
+    proxy_autoconfig.wait_ready()
+    try:
+        username = settings.get("username", USERNAME)
+        password = settings.get("password", PASSWORD)
+        fms_base = settings.get("host", FMS_BASE_URL_DEFAULT)
+
+        if not username or not password:
+            return False, "Chybí uživatelské jméno nebo heslo. Doplňte chybějící údaj v Nastavení."
+
+        policy = RequestPolicy.from_settings(settings)
+        token = policy.call(_get_bearer_token, username, password)
+        if not token:
+            return False, "Nepodařilo se získat autorizační token."
+
+        folder_path = remote_folder if remote_folder.startswith("/TP_export/") else f"/TP_export/{remote_folder}"
+        folder_json = policy.call(_list_folder, fms_base, token, folder_path)
+        items = folder_json.get("contentItemList", [])
+
+        to_download = []
+        for item in items:
+            name = item.get("name", "")
+            if not name:
+                continue
+            if pattern_keyword in name and any(key in name for key in month_keys):
+                file_id = item.get("fileId")
+                if file_id:
+                    to_download.append((file_id, name, _item_fingerprint(item)))
+
+        if not to_download:
+            return False, "Nebyly nalezeny žádné soubory pro zvolené období."
+
+        compression = settings.get("download_compression", "none")
+        if compression not in COMPRESSION_SUFFIXES:
+            return False, f"Neznámý typ komprese: {compression}"
+        if compression == "zstd":
+            try:
+                import zstandard  # noqa: F401
+            except ImportError:
+                return False, "Komprese zstd vyžaduje balíček zstandard (pip install zstandard)."
+        suffix = COMPRESSION_SUFFIXES[compression]
+        # Segmented (parallel byte-range) download of large files; 1 = single stream
+        segments = max(1, int(settings.get("download_segments", 1)))
+        segment_min_bytes = int(float(settings.get("segment_min_mb", 50)) * 1024 * 1024)
+
+        if known_files is not None:
+            to_download = [
+                (file_id, name, fingerprint) for file_id, name, fingerprint in to_download
+                if known_files.get(name) != fingerprint
+                or not os.path.exists(os.path.join(settings['download_path'], name + suffix))
+            ]
+
+        os.makedirs(settings['download_path'], exist_ok=True)
+        # Worker count is an upper bound; the policy's adaptive limiter decides how many run at once
+        with ThreadPoolExecutor(max_workers=policy.limiter.maximum) as pool:
+            futures = [
+                pool.submit(policy.call, _download_file_by_id, fms_base, token, file_id,
+                            os.path.join(settings['download_path'], name + suffix), compression=compression,
+                            segments=segments, segment_min_bytes=segment_min_bytes, policy=policy)
+                for file_id, name, _ in to_download
+            ]
+            for future, (_, name, fingerprint) in zip(futures, to_download):
+                future.result()
+                if known_files is not None:
+                    known_files[name] = fingerprint
+
+        return True, None
+
+    except requests.exceptions.SSLError as e:
+        return False, (
+            "Chyba ověření TLS certifikátu (SSL). "
+            "Zkuste nastavit cestu k firemnímu CA (PEM) do Nastavení nebo dočasně vypnout ověřování."
+        )
+    except requests.HTTPError as e:
+        try:
+            detail = e.response.text
+        except Exception:
+            detail = str(e)
+        return False, f"Chyba při stahování (HTTP): {detail}"
+    except Exception as e:
+        return False, f"Chyba při stahování: {str(e)}"
@@ -0,0 +1,4 @@
+# First runtime hook in every build: marks when Python took over from the bootloader,
+# so main.py can report the full time until the window is shown.
+import os, time
+os.environ.setdefault('ENTSOE_STARTUP_T0', repr(time.time()))
@@ -1,146 +1,29 @@
+import os
+import time
+# Frozen builds set this in the first runtime hook; from source, startup starts here
+STARTUP_T0 = float(os.environ.get("ENTSOE_STARTUP_T0", time.time()))
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import json
-import os
-import requests
-from urllib.parse import urljoin
+import multiprocessing
+import sys
+import threading
 from datetime import datetime
-from export_combined_excel import export_combined_excel
-
-SETTINGS_FILE = "settings.json"
-FMS_BASE_URL_DEFAULT = "https://fms.tp.entsoe.eu/"
-KEYCLOAK_TOKEN_URL = "https://keycloak.tp.entsoe.eu/realms/tp/protocol/openid-connect/token"
-USERNAME = "test"
-PASSWORD = "test"
-
-def load_settings():
-    default_download = os.path.join(os.path.expanduser("~"), "Downloads")
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, "r") as f:
-            return json.load(f)
-    return {
-        "host": FMS_BASE_URL_DEFAULT,
-        "username": USERNAME,
-        "password": PASSWORD,
-        "download_path": default_download,
-    }
-
-def save_settings(data):
-    with open(SETTINGS_FILE, "w") as f:
-        json.dump(data, f)
-
-def generate_month_keys(start_year, start_month, end_year, end_month):
-    try:
-        start = datetime(int(start_year), int(start_month), 1)
-        end = datetime(int(end_year), int(end_month), 1)
-    except ValueError:
-        return []
-    
-    keys = []
-    while start <= end:
-        keys.append(start.strftime("%Y_%m"))
-        if start.month == 12:
-            start = datetime(start.year + 1, 1, 1)
-        else:
-            start = datetime(start.year, start.month + 1, 1)
-    return keys
-
-def _get_bearer_token(username: str, password: str, timeout: int = 30) -> str:
-    data = {
-        "client_id": "tp-fms-public",
-        "grant_type": "password",
-        "username": username,
-        "password": password,
-    }
-    resp = requests.post(KEYCLOAK_TOKEN_URL, data=data, timeout=timeout)
-    resp.raise_for_status()
-    payload = resp.json()
-    return payload.get("access_token", "")
-
-
-def _list_folder(fms_base_url: str, token: str, path: str, page_size: int = 5000, timeout: int = 60):
-    url = urljoin(fms_base_url, "listFolder")
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    if not path.endswith("/"):
-        path = path + "/"
-    body = {
-        "path": path,
-        "sorterList": [
-            {"key": "periodCovered.from", "ascending": True}
-        ],
-        "pageInfo": {"pageIndex": 0, "pageSize": page_size},
-    }
-    resp = requests.post(url, headers=headers, json=body, timeout=timeout)
-    resp.raise_for_status()
-    return resp.json()
-
-
-def _download_file_by_id(fms_base_url: str, token: str, file_id: str, local_path: str, timeout: int = 300):
-    url = urljoin(fms_base_url, "downloadFileContent")
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    body = {
-        "fileIdList": [file_id],
-        "topLevelFolder": "TP_export",
-        "downloadAsZip": False,
-    }
-    with requests.post(url, headers=headers, json=body, stream=True, timeout=timeout) as r:
-        r.raise_for_status()
-        with open(local_path, "wb") as f:
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    f.write(chunk)
-
-
-def download_files_by_month(settings, remote_folder, pattern_keyword, month_keys):
-    try:
-        username = settings.get("username", USERNAME)
-        password = settings.get("password", PASSWORD)
-        fms_base = settings.get("host", FMS_BASE_URL_DEFAULT)
-
-        if not username or not password:
-            return False, "Chybí uživatelské jméno nebo heslo. Doplňte chybějící údaj v Nastavení."
-
-        token = _get_bearer_token(username, password)
-        if not token:
-            return False, "Nepodařilo se získat autorizační token."
-
-        folder_path = remote_folder if remote_folder.startswith("/TP_export/") else f"/TP_export/{remote_folder}"
-        folder_json = _list_folder(fms_base, token, folder_path)
-        items = folder_json.get("contentItemList", [])
-
-        to_download = []
-        for item in items:
-            name = item.get("name", "")
-            if not name:
-                continue
-            if pattern_keyword in name and any(key in name for key in month_keys):
-                file_id = item.get("fileId")
-                if file_id:
-                    to_download.append((file_id, name))
-
-        if not to_download:
-            return False, "Nebyly nalezeny žádné soubory pro zvolené období."
-
-        os.makedirs(settings['download_path'], exist_ok=True)
-        for file_id, name in to_download:
-            local_path = os.path.join(settings['download_path'], name)
-            _download_file_by_id(fms_base, token, file_id, local_path)
-
-        return True, None
-
-    except requests.exceptions.SSLError as e:
-        return False, (
-            "Chyba ověření TLS certifikátu (SSL). "
-            "Zkuste nastavit cestu k firemnímu CA (PEM) do Nastavení nebo dočasně vypnout ověřování."
-        )
-    except requests.HTTPError as e:
-        try:
-            detail = e.response.text
-        except Exception:
-            detail = str(e)
-        return False, f"Chyba při stahování (HTTP): {detail}"
-    except Exception as e:
-        return False, f"Chyba při stahování: {str(e)}"
+from countries import COUNTRIES
+from file_library import (
+    COMPRESSION_SUFFIXES, download_files_by_month, generate_month_keys, load_settings, save_settings,
+)
+# requests, pandas (export_combined_excel) and request_policy are imported on first use and
+# warmed up in the background once the window is shown, see warm_up_imports()
+
+STARTUP_TIMING_FILE = "startup_timing.json"
+
+
+def warm_up_imports():
+    import requests  # noqa: F401
+    import request_policy  # noqa: F401
+    import export_combined_excel  # noqa: F401
 
 
 class FileLibraryDownloaderApp:
@@ -157,6 +40,35 @@ class FileLibraryDownloaderApp:
         self.create_settings_tab()
         self.create_description_tab()
 
+        self.startup_timing = {}
+        self._warm_done = threading.Event()
+        self.root.after(0, self.on_window_shown)
+
+    def on_window_shown(self):
+        self.startup_timing["window_s"] = round(time.time() - STARTUP_T0, 3)
+        threading.Thread(target=self._warm_up, name="warm-up", daemon=True).start()
+        self.root.after(50, self._poll_warm_up)
+
+    def _warm_up(self):
+        try:
+            warm_up_imports()
+        finally:
+            self.startup_timing["ready_s"] = round(time.time() - STARTUP_T0, 3)
+            self._warm_done.set()
+
+    def _poll_warm_up(self):
+        # Tk is not thread-safe: the worker only sets an event, the UI is updated from here
+        if not self._warm_done.is_set():
+            self.root.after(50, self._poll_warm_up)
+            return
+        t = self.startup_timing
+        self.startup_label.config(text=f"Spuštění: okno {t['window_s']:.2f} s, připraveno {t['ready_s']:.2f} s")
+        if "--measure-startup" in sys.argv:
+            with open(STARTUP_TIMING_FILE, "w") as f:
+                json.dump(t, f)
+            print(json.dumps(t))
+            self.root.destroy()
+
     def create_download_tab(self):
         self.download_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.download_tab, text="Stažení dat")
@@ -190,7 +102,15 @@ class FileLibraryDownloaderApp:
         self.end_month_cb.grid(row=7, column=0, sticky="w", padx=20)
         self.end_year_cb.grid(row=7, column=0, sticky="e", padx=20)
 
-        ttk.Button(self.download_tab, text="Zpracovat data", command=self.download_data).grid(row=8, column=0, pady=20)
+        ttk.Label(self.download_tab, text="Země:").grid(row=8, column=0, sticky="w", padx=10, pady=(10, 0))
+        selected = set(self.settings.get("countries", COUNTRIES))
+        self.country_vars = {code: tk.BooleanVar(value=code in selected) for code in COUNTRIES}
+        countries_frame = ttk.Frame(self.download_tab)
+        countries_frame.grid(row=9, column=0, sticky="w", padx=20)
+        for i, (code, var) in enumerate(self.country_vars.items()):
+            ttk.Checkbutton(countries_frame, text=code, variable=var).grid(row=0, column=i, sticky="w")
+
+        ttk.Button(self.download_tab, text="Zpracovat data", command=self.download_data).grid(row=10, column=0, pady=20)
 
     def create_settings_tab(self):
         self.settings_tab = ttk.Frame(self.notebook)
@@ -214,7 +134,11 @@ class FileLibraryDownloaderApp:
         self.pass_var = tk.StringVar(value=self.settings.get("password", ""))
         ttk.Entry(self.settings_tab, textvariable=self.pass_var, show="*", width=40).grid(row=3, column=1, sticky="w")
 
-        ttk.Button(self.settings_tab, text="Uložit nastavení", command=lambda: self.save(show_message=True)).grid(row=4, column=1, pady=10, sticky="w")
+        ttk.Label(self.settings_tab, text="Komprese souborů:").grid(row=4, column=0, sticky="w")
+        self.compression_var = tk.StringVar(value=self.settings.get("download_compression", "none"))
+        ttk.Combobox(self.settings_tab, values=list(COMPRESSION_SUFFIXES), textvariable=self.compression_var, width=8, state="readonly").grid(row=4, column=1, sticky="w")
+
+        ttk.Button(self.settings_tab, text="Uložit nastavení", command=lambda: self.save(show_message=True)).grid(row=5, column=1, pady=10, sticky="w")
 
     def create_description_tab(self):
         self.description_tab = ttk.Frame(self.notebook)
@@ -234,6 +158,9 @@ class FileLibraryDownloaderApp:
         label = ttk.Label(self.description_tab, text=text, justify="left", wraplength=500)
         label.pack(padx=20, pady=20, anchor="w")
 
+        self.startup_label = ttk.Label(self.description_tab, text="", foreground="gray")
+        self.startup_label.pack(padx=20, pady=(0, 10), anchor="w")
+
     def browse_folder(self):
         folder = filedialog.askdirectory()
         if folder:
@@ -241,16 +168,22 @@ class FileLibraryDownloaderApp:
 
     def save(self, show_message=True):
         data = {
+            **self.settings,
             "download_path": self.path_var.get(),
             "host": self.host_var.get(),
             "username": self.user_var.get(),
-            "password": self.pass_var.get()
+            "password": self.pass_var.get(),
+            "download_compression": self.compression_var.get(),
+            "countries": self.selected_countries(),
         }
         save_settings(data)
         self.settings = data
         if show_message:
             messagebox.showinfo("Uloženo", "Nastavení byla uložena.")
 
+    def selected_countries(self):
+        return [code for code, var in self.country_vars.items() if var.get()]
+
     def download_data(self):
         self.save(show_message=False)
 
@@ -277,6 +210,11 @@ class FileLibraryDownloaderApp:
             messagebox.showinfo("Hotovo", "Nebyla vybrána žádná datová sada.")
             return
 
+        countries = self.selected_countries()
+        if not countries:
+            messagebox.showinfo("Hotovo", "Nebyla vybrána žádná země.")
+            return
+
         messagebox.showinfo("Zpracování", "Skoč si na kafe, data se zpracovávají...")
 
         keys = generate_month_keys(sy, sm, ey, em)
@@ -309,7 +247,14 @@ class FileLibraryDownloaderApp:
                     
 
         if (self.include_reserves.get() and reserves_success) or (self.include_energy.get() and energy_success):
-            excel_path = export_combined_excel(self.settings["download_path"], start_date, end_date)
+            from export_combined_excel import export_combined_excel
+            excel_path = export_combined_excel(
+                self.settings["download_path"], start_date, end_date, countries,
+                workers=int(self.settings.get("export_workers", 1)),
+                split_by_country=bool(self.settings.get("export_split_by_country", False)),
+            )
+            if isinstance(excel_path, list):
+                excel_path = "\n".join(excel_path)
             if excel_path:
                 messagebox.showinfo("Hotovo", f"Výstupní Excel byl uložen zde: {excel_path}")
             else:
@@ -318,6 +263,8 @@ class FileLibraryDownloaderApp:
             messagebox.showinfo("Hotovo", "Nebyla nalezena žádná použitelná data.")
 
 if __name__ == "__main__":
+    # Required for the export's worker processes in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = FileLibraryDownloaderApp(root)
     root.mainloop()
@@ -0,0 +1,89 @@
+import os
+import threading
+
+# Best-effort proxy detection from WinINET/PAC. Detection can take seconds (PAC download),
+# so the proxy runtime hook starts it in the background and network code waits for it
+# via wait_ready() right before the first request.
+_thread = None
+_done = threading.Event()
+_lock = threading.Lock()
+
+
+def detect_proxy_url():
+    try:
+        import winreg
+    except Exception:
+        return None
+
+    proxy_url = None
+    try:
+        key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, r"Software\Microsoft\Windows\CurrentVersion\Internet Settings")
+        try:
+            proxy_enable, _ = winreg.QueryValueEx(key, 'ProxyEnable')
+        except FileNotFoundError:
+            proxy_enable = 0
+        try:
+            proxy_server, _ = winreg.QueryValueEx(key, 'ProxyServer')
+        except FileNotFoundError:
+            proxy_server = ''
+        try:
+            pac_url, _ = winreg.QueryValueEx(key, 'AutoConfigURL')
+        except FileNotFoundError:
+            pac_url = ''
+        if proxy_enable and proxy_server:
+            # Use direct ProxyServer value (may include per-protocol entries)
+            parts = dict(x.split('=', 1) if '=' in x else ('http', x) for x in proxy_server.split(';') if x)
+            proxy_url = parts.get('https', parts.get('http'))
+        elif pac_url:
+            proxy_url = _proxy_from_pac(pac_url)
+    except Exception:
+        pass
+
+    if proxy_url and '://' not in proxy_url:
+        proxy_url = 'http://' + proxy_url
+    return proxy_url
+
+
+def _proxy_from_pac(pac_url):
+    try:
+        from pypac import PACSession, get_pac
+        pac = get_pac(url=pac_url)
+        # Prefer HTTPS proxy for target hosts
+        for test_url in ('https://keycloak.tp.entsoe.eu/', 'https://fms.tp.entsoe.eu/'):
+            sess = PACSession(pac=pac)
+            pr = sess.get_proxy_for_urls([test_url])
+            # pr is a map url->ProxyConfig; grab https if present
+            for u, cfg in pr.items():
+                if cfg and cfg.proxies:
+                    https_p = cfg.proxies.get('https') or cfg.proxies.get('http')
+                    if https_p:
+                        return https_p
+    except Exception:
+        pass
+    return None
+
+
+def apply_proxy_env():
+    try:
+        proxy_url = detect_proxy_url()
+        if proxy_url:
+            os.environ.setdefault('HTTPS_PROXY', proxy_url)
+            os.environ.setdefault('HTTP_PROXY', proxy_url)
+            # bypass local
+            os.environ.setdefault('NO_PROXY', 'localhost,127.0.0.1,.local')
+    finally:
+        _done.set()
+
+
+def start_background():
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=apply_proxy_env, name="proxy-autoconfig", daemon=True)
+            _thread.start()
+
+
+def wait_ready(timeout: float | None = 30):
+    # No-op in builds that never started detection
+    if _thread is not None:
+        _done.wait(timeout)
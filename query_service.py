@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from export_combined_excel import (
+    COUNTRIES, _list_data_files, _month_keys_for, _next_month, clipped_grid_end, get_energy_dfs, get_reserves_dfs,
+    merge_tables,
+)
+from file_library import load_settings
+from rollups import LEVEL_LABELS, RollupEngine
+
+DEFAULT_PORT = 8765
+DATA_KEYWORDS = ("AmountAndPricesPaidOfBalancingReservesUnderContract", "PricesOfActivatedBalancingEnergy")
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+def _parse_month(value: str) -> datetime:
+    # Accepts YYYY-MM (or YYYY_MM, as in the File Library names)
+    return datetime.strptime(value.replace("_", "-")[:7], "%Y-%m")
+
+
+def _month_range(start: datetime, end: datetime):
+    months = []
+    while start <= end:
+        months.append(start)
+        start = _next_month(start)
+    return months
+
+
+class AggregateStore:
+    # Hourly merged tables per (country, month), built by the export pipeline and kept in an LRU.
+    # Keys include a fingerprint of the data files, so new downloads invalidate stale entries.
+    def __init__(self, folder_path: str, max_entries: int = 256):
+        self.folder_path = folder_path
+        self.cache = LRUCache(max_entries)
+        self._load_lock = threading.Lock()
+
+    def _fingerprint(self, month: datetime):
+        # Only the files that can hold this month's rows, so downloads of other months keep it cached
+        month_keys = _month_keys_for(month, _next_month(month))
+        files = []
+        for keyword in DATA_KEYWORDS:
+            for path in _list_data_files(self.folder_path, keyword, month_keys):
+                files.append((os.path.basename(path), os.path.getmtime(path)))
+        return hash(tuple(files))
+
+    def _cached(self, country: str, months):
+        keys = {m: (self._fingerprint(m), country, m) for m in months}
+        return keys, {m: self.cache.get(key) for m, key in keys.items()}
+
+    def hourly(self, country: str, start: datetime, end: datetime) -> pd.DataFrame:
+        months = _month_range(start, end)
+        keys, tables = self._cached(country, months)
+        if any(table is None for table in tables.values()):
+            with self._load_lock:
+                # Another request may have loaded the same months while we waited for the lock
+                keys, tables = self._cached(country, months)
+                missing = [m for m, table in tables.items() if table is None]
+                if missing:
+                    # Load all missing months with a single pass over their files, then cache them month by month
+                    first, last_exclusive = missing[0], _next_month(missing[-1])
+                    (res_df,) = get_reserves_dfs(self.folder_path, first, last_exclusive, [country])
+                    (en_df,) = get_energy_dfs(self.folder_path, first, last_exclusive, [country])
+                    for m in missing:
+                        month_res, month_en = _slice_month(res_df, m), _slice_month(en_df, m)
+                        # Same grid as the export: the running month ends at its last hour with data
+                        grid_end = clipped_grid_end(_next_month(m), month_res, month_en)
+                        table = merge_tables(month_res, month_en, m, grid_end)
+                        self.cache.put(keys[m], table)
+                        tables[m] = table
+        parts = [t for t in (tables[m] for m in months) if not t.empty]
+        if not parts:
+            return pd.DataFrame()
+        return pd.concat(parts, ignore_index=True)
+
+    def query(self, country: str, start: datetime, end: datetime, level: str = "hour", columns=None) -> pd.DataFrame:
+        hourly = self.hourly(country, start, end)
+        if hourly.empty:
+            return hourly
+        if level == "hour":
+            result = hourly
+        else:
+            rollups = RollupEngine()
+            rollups.update(country, hourly)
+            result = rollups.averages(country, level)
+        if columns:
+            label = LEVEL_LABELS[level]
+            result = result[[label] + [c for c in columns if c in result.columns and c != label]]
+        return result
+
+
+def _slice_month(df: pd.DataFrame, month: datetime) -> pd.DataFrame:
+    if df.empty:
+        return df
+    return df[(df["ISP(UTC)"] >= month) & (df["ISP(UTC)"] < _next_month(month))]
+
+
+def _to_arrow(df: pd.DataFrame) -> bytes:
+    import pyarrow as pa  # optional dependency, only needed for format=arrow
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def make_handler(store: AggregateStore):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _error(self, status: int, message: str):
+            self._send(status, json.dumps({"error": message}).encode("utf-8"), "application/json")
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                return self._send(200, b'{"status": "ok"}', "application/json")
+            if url.path != "/series":
+                return self._error(404, "Unknown endpoint, use /series")
+
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            country = params.get("country", "").upper()
+            level = params.get("level", "hour")
+            fmt = params.get("format", "json")
+            columns = [c for c in params.get("columns", "").split(",") if c]
+            if country not in COUNTRIES:
+                return self._error(400, f"country must be one of {', '.join(COUNTRIES)}")
+            if level not in LEVEL_LABELS:
+                return self._error(400, f"level must be one of {', '.join(LEVEL_LABELS)}")
+            if fmt not in ("json", "arrow"):
+                return self._error(400, "format must be json or arrow")
+            try:
+                start = _parse_month(params["from"])
+                end = _parse_month(params.get("to", params["from"]))
+            except (KeyError, ValueError):
+                return self._error(400, "from/to must be months in YYYY-MM format")
+            if start > end:
+                return self._error(400, "from must not be after to")
+
+            try:
+                df = store.query(country, start, end, level, columns)
+            except Exception as e:
+                return self._error(500, f"Query failed: {e}")
+            if fmt == "arrow":
+                try:
+                    body = _to_arrow(df)
+                except ImportError:
+                    return self._error(501, "Arrow output requires pyarrow (pip install pyarrow)")
+                return self._send(200, body, "application/vnd.apache.arrow.stream")
+            body = df.to_json(orient="records", date_format="iso").encode("utf-8") if not df.empty else b"[]"
+            return self._send(200, body, "application/json")
+
+    return QueryHandler
+
+
+def serve(folder_path: str, host: str = "127.0.0.1", port: int = DEFAULT_PORT, cache_entries: int = 256):
+    server = ThreadingHTTPServer((host, port), make_handler(AggregateStore(folder_path, cache_entries)))
+    print(f"Query service on http://{host}:{port}/series (data: {folder_path})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    default_folder = load_settings().get("download_path")
+    parser = argparse.ArgumentParser(description="Local read API over aggregated ENTSO-E balancing data.")
+    parser.add_argument("--folder", default=default_folder, help="Folder with downloaded CSVs (default: download_path from settings.json)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-entries", type=int, default=256, help="Max (country, month) tables kept in memory")
+    args = parser.parse_args()
+    if not args.folder:
+        parser.error("--folder is required when settings.json has no download_path")
+    serve(args.folder, args.host, args.port, args.cache_entries)
+
+
+if __name__ == "__main__":
+    main()
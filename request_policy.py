@@ -0,0 +1,212 @@
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import requests
+
+# Statuses worth another attempt; 429/503 additionally mean "slow down"
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+
+
+def _retry_after_seconds(response) -> float | None:
+    # Retry-After is either delta-seconds or an HTTP date
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class AdaptiveLimiter:
+    # AIMD concurrency limit: halve on throttling, +1 after a full window of successes
+    def __init__(self, initial: int = 2, minimum: int = 1, maximum: int = 8):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self._in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self):
+        with self._cond:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+
+
+class CircuitBreaker:
+    # Opens after consecutive failures. While open, callers wait; after reset_timeout a single
+    # probe call is let through, and its outcome closes or re-opens the circuit.
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self._cond = threading.Condition()
+        self._parent = None
+
+    def child(self):
+        # Breaker for sub-requests of a call that already passed ours (file segments): its own
+        # open/probe state, so segments never wait on a probe their parent call holds, while
+        # their successes and failures still count towards our state.
+        child = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+        child._parent = self
+        return child
+
+    def before_call(self):
+        with self._cond:
+            while self._opened_at is not None:
+                remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+                if not self._probing and remaining <= 0:
+                    self._probing = True
+                    return
+                self._cond.wait(None if self._probing else remaining)
+
+    def record_success(self):
+        with self._cond:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+            self._cond.notify_all()
+        if self._parent is not None:
+            self._parent.record_success()
+
+    def record_failure(self):
+        with self._cond:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+            self._cond.notify_all()
+        if self._parent is not None:
+            self._parent.record_failure()
+
+    def release_probe(self):
+        # The probe ended without a health signal (e.g. a local error): let another caller probe
+        with self._cond:
+            if self._probing:
+                self._probing = False
+                self._cond.notify_all()
+
+
+class RequestPolicy:
+    # Shared retry/backoff policy for token, listing and download calls
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 limiter: AdaptiveLimiter | None = None, breaker: CircuitBreaker | None = None,
+                 sleep=time.sleep):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.limiter = limiter or AdaptiveLimiter()
+        self.breaker = breaker or CircuitBreaker()
+        # A single call must be able to use all its retries before it can trip the breaker
+        self.breaker.failure_threshold = max(self.breaker.failure_threshold, self.max_attempts)
+        self._sleep = sleep
+        self._parent = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            max_attempts=int(settings.get("max_retries", 5)),
+            limiter=AdaptiveLimiter(maximum=int(settings.get("max_parallel_downloads", 4))),
+        )
+
+    def child(self, concurrency: int):
+        # Policy for sub-requests of a call that already holds one of our limiter slots (file
+        # segments): its own limiter and breaker so it cannot deadlock on ours, capped by our
+        # current limit; breaker outcomes and throttling are propagated back to us.
+        concurrency = max(1, min(concurrency, self.limiter.limit))
+        child = RequestPolicy(
+            max_attempts=self.max_attempts, base_delay=self.base_delay, max_delay=self.max_delay,
+            limiter=AdaptiveLimiter(initial=concurrency, maximum=concurrency),
+            breaker=self.breaker.child(), sleep=self._sleep,
+        )
+        child._parent = self
+        return child
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, func, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            self.limiter.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except requests.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status not in RETRY_STATUSES:
+                    # Client errors (401, 404, ...): the server answered, so it is healthy
+                    self.breaker.record_success()
+                    raise
+                error, response = e, e.response
+            except (requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                if isinstance(e, requests.exceptions.SSLError):
+                    self.breaker.release_probe()
+                    raise
+                error, response, status = e, None, None
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+            else:
+                self.breaker.record_success()
+                self.limiter.on_success()
+                return result
+            finally:
+                self.limiter.release()
+
+            delay = _retry_after_seconds(response)
+            if status == 429 or (status in THROTTLE_STATUSES and delay is not None):
+                # Throttling is the server pacing us, not failing: back off, don't trip the breaker
+                self.on_throttle()
+                self.breaker.release_probe()
+            else:
+                self.breaker.record_failure()
+                if status in THROTTLE_STATUSES:
+                    self.on_throttle()
+            attempt += 1
+            if attempt >= self.max_attempts:
+                raise error
+            if delay is None:
+                delay = self._backoff(attempt)
+            self._sleep(delay)
+
+    def on_throttle(self):
+        self.limiter.on_throttle()
+        if self._parent is not None:
+            self._parent.on_throttle()
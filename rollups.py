@@ -0,0 +1,103 @@
+import pandas as pd
+
+# Output label column per rollup level (matches the existing "Den" daily sheet)
+LEVEL_LABELS = {
+    "hour": "ISP(UTC)",
+    "day": "Den",
+    "week": "Týden",
+    "month": "Měsíc",
+}
+
+
+def _period_start(index: pd.DatetimeIndex, level: str) -> pd.DatetimeIndex:
+    if level == "hour":
+        return index.floor("h")
+    if level == "day":
+        return index.normalize()
+    if level == "week":
+        # ISO weeks starting on Monday
+        return index.normalize() - pd.to_timedelta(index.dayofweek, unit="D")
+    if level == "month":
+        return index.to_period("M").to_timestamp()
+    raise ValueError(f"Unknown rollup level: {level}")
+
+
+class RollupEngine:
+    # Keeps additive (sum, count) accumulators per country, column and hour and rolls
+    # them up to day/week/month. Averages are sum/count, so missing hours are weighted
+    # correctly, and updating an hour only applies the delta to the higher levels.
+    def __init__(self):
+        self._hourly = {}   # country -> (sums, counts) indexed by hour
+        self._levels = {}   # (country, level) -> (sums, counts) indexed by period start
+        self._columns = {}  # country -> column order as first seen
+
+    def countries(self):
+        return list(self._hourly)
+
+    def update(self, country: str, hourly_df: pd.DataFrame):
+        if hourly_df.empty or "ISP(UTC)" not in hourly_df.columns:
+            return
+        df = hourly_df.copy()
+        df["ISP(UTC)"] = pd.to_datetime(df["ISP(UTC)"]).dt.floor("h")
+        numeric_cols = [c for c in df.columns if c != "ISP(UTC)" and pd.api.types.is_numeric_dtype(df[c])]
+        if not numeric_cols:
+            return
+        df = df.set_index("ISP(UTC)")[numeric_cols]
+        new_sums = df.fillna(0).groupby(level=0).sum()
+        new_counts = df.notna().astype("int64").groupby(level=0).sum()
+        columns = self._columns.setdefault(country, [])
+        columns.extend(c for c in numeric_cols if c not in columns)
+
+        old_sums, old_counts = self._hourly.get(country, (pd.DataFrame(), pd.DataFrame()))
+        # Columns absent from this update keep their previous hourly contribution
+        for col in old_sums.columns.difference(new_sums.columns):
+            new_sums[col] = old_sums[col].reindex(new_sums.index).fillna(0)
+            new_counts[col] = old_counts[col].reindex(new_counts.index).fillna(0).astype("int64")
+        # Delta = new contribution minus whatever these hours contributed before
+        delta_sums = new_sums.sub(old_sums.reindex(new_sums.index), fill_value=0)
+        delta_counts = new_counts.sub(old_counts.reindex(new_counts.index), fill_value=0)
+
+        if old_sums.empty:
+            self._hourly[country] = (new_sums, new_counts)
+        else:
+            sums = new_sums.combine_first(old_sums)
+            counts = new_counts.combine_first(old_counts).fillna(0).astype("int64")
+            self._hourly[country] = (sums.fillna(0), counts)
+
+        # Single pass up the hierarchy: hour -> day, then day -> week and day -> month
+        day_sums = delta_sums.groupby(_period_start(delta_sums.index, "day")).sum()
+        day_counts = delta_counts.groupby(_period_start(delta_counts.index, "day")).sum()
+        self._merge(country, "day", day_sums, day_counts)
+        for level in ("week", "month"):
+            self._merge(
+                country, level,
+                day_sums.groupby(_period_start(day_sums.index, level)).sum(),
+                day_counts.groupby(_period_start(day_counts.index, level)).sum(),
+            )
+
+    def _merge(self, country, level, sums, counts):
+        key = (country, level)
+        if key in self._levels:
+            old_sums, old_counts = self._levels[key]
+            sums = old_sums.add(sums, fill_value=0)
+            counts = old_counts.add(counts, fill_value=0)
+        self._levels[key] = (sums.sort_index(), counts.sort_index())
+
+    def averages(self, country: str, level: str = "day") -> pd.DataFrame:
+        if level not in LEVEL_LABELS:
+            raise ValueError(f"Unknown rollup level: {level}")
+        if level == "hour":
+            sums, counts = self._hourly.get(country, (pd.DataFrame(), pd.DataFrame()))
+            sums, counts = sums.sort_index(), counts.sort_index()
+        else:
+            sums, counts = self._levels.get((country, level), (pd.DataFrame(), pd.DataFrame()))
+        if sums.empty:
+            return pd.DataFrame()
+        # Periods/columns with no observed hours stay NaN instead of 0
+        means = (sums / counts.where(counts > 0)).reindex(columns=self._columns[country])
+        label = LEVEL_LABELS[level]
+        means.index.name = label
+        means = means.reset_index()
+        if level == "day":
+            means[label] = means[label].dt.date
+        return means
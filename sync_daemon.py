@@ -0,0 +1,162 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+from countries import COUNTRIES
+from file_library import download_files_by_month, generate_month_keys, load_settings
+
+# Same datasets as the GUI: (remote folder, filename keyword)
+DATASETS = [
+    ("/TP_export/AmountAndPricesPaidOfBalancingReservesUnderContract_17.1.B_C_r3",
+     "AmountAndPricesPaidOfBalancingReservesUnderContract"),
+    ("/TP_export/PricesOfActivatedBalancingEnergy_17.1.F_r3",
+     "PricesOfActivatedBalancingEnergy"),
+]
+STATE_FILE = "sync_state.json"
+OUTPUT_NAME = "regulacni_zalohy_a_energie_sync.xlsx"
+# The File Library is regenerated roughly hourly, polling more often only costs requests
+DEFAULT_INTERVAL_S = 15 * 60
+MONTH_KEY_RE = re.compile(r"(\d{4})_(\d{2})")
+
+
+def _synced_months(months_back: int):
+    now = datetime.now()
+    start = datetime(now.year, now.month, 1)
+    for _ in range(months_back - 1):
+        start = datetime(start.year - 1, 12, 1) if start.month == 1 else datetime(start.year, start.month - 1, 1)
+    return [datetime.strptime(key, "%Y_%m") for key in generate_month_keys(start.year, start.month, now.year, now.month)]
+
+
+class SyncDaemon:
+    # Polls the File Library listings, downloads only files whose metadata changed, rebuilds
+    # only the affected months' tables and rewrites the output workbook atomically.
+    def __init__(self, settings, countries=None, months_back: int = 1, interval_s: float = DEFAULT_INTERVAL_S):
+        self.settings = settings
+        self.folder_path = settings["download_path"]
+        wanted = set(countries or COUNTRIES)
+        if wanted - set(COUNTRIES):
+            raise ValueError(f"Neznámé země: {', '.join(sorted(wanted - set(COUNTRIES)))}")
+        # COUNTRIES order, matching the tuples returned by get_reserves_dfs/get_energy_dfs
+        self.countries = [c for c in COUNTRIES if c in wanted]
+        self.months_back = months_back
+        self.interval_s = interval_s
+        self.state_path = os.path.join(self.folder_path, STATE_FILE)
+        self.output_path = os.path.join(self.folder_path, OUTPUT_NAME)
+        self.known_files = self._load_state()
+        self.month_tables = {}  # month -> {country: merged hourly table}
+        # Cleared only once the work succeeded, so a failed build or a locked workbook is retried next poll
+        self.dirty_months = set()
+        self.output_pending = False
+        self._stop = threading.Event()
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, "r") as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.known_files, f)
+        os.replace(tmp_path, self.state_path)
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.sync_once()
+            except Exception as e:
+                print(f"❌ Synchronizace selhala: {e}")
+            # Idle between polls: a single blocking wait, no CPU or network use
+            self._stop.wait(max(0.0, self.interval_s - (time.monotonic() - started)))
+
+    def sync_once(self):
+        months = _synced_months(self.months_back)
+        month_keys = [m.strftime("%Y_%m") for m in months]
+        before = dict(self.known_files)
+        for remote_folder, keyword in DATASETS:
+            success, msg_error = download_files_by_month(
+                self.settings, remote_folder, keyword, month_keys, known_files=self.known_files
+            )
+            if not success:
+                print(f"⚠️ {keyword}: {msg_error}")
+
+        changed = {name for name, fp in self.known_files.items() if before.get(name) != fp}
+        if changed:
+            self._save_state()
+        changed_months = {
+            datetime(int(m.group(1)), int(m.group(2)), 1)
+            for m in (MONTH_KEY_RE.search(name) for name in changed) if m
+        }
+        # Months that rolled out of the window are dropped, new or changed ones are rebuilt
+        kept = {m: t for m, t in self.month_tables.items() if m in months}
+        if len(kept) != len(self.month_tables):
+            self.output_pending = True
+        self.month_tables = kept
+        self.dirty_months |= changed_months | {m for m in months if m not in self.month_tables}
+        self.dirty_months &= set(months)
+        if not self.dirty_months and not self.output_pending:
+            return False
+        rebuilt = sorted(self.dirty_months)
+        for month in rebuilt:
+            self.month_tables[month] = self._build_month(month)
+            self.dirty_months.discard(month)
+            self.output_pending = True
+        self._write_output(months)
+        self.output_pending = False
+        print(f"✅ {datetime.now():%Y-%m-%d %H:%M} aktualizováno: {', '.join(m.strftime('%Y_%m') for m in rebuilt) or 'výstup'}")
+        return True
+
+    def _build_month(self, month: datetime):
+        from export_combined_excel import (
+            _next_month, clipped_grid_end, get_energy_dfs, get_reserves_dfs, merge_tables,
+        )
+        end_exclusive = _next_month(month)
+        reserves = get_reserves_dfs(self.folder_path, month, end_exclusive, self.countries)
+        energy = get_energy_dfs(self.folder_path, month, end_exclusive, self.countries)
+        # Same grid as the export: the running month ends at its last hour with data
+        grid_end = clipped_grid_end(end_exclusive, *reserves, *energy)
+        return {
+            code: merge_tables(res_df, en_df, month, grid_end)
+            for code, res_df, en_df in zip(self.countries, reserves, energy)
+        }
+
+    def _write_output(self, months):
+        import pandas as pd
+        from export_combined_excel import write_merged_workbook
+        merged_by_country = {}
+        for code in self.countries:
+            parts = [self.month_tables[m][code] for m in months if not self.month_tables[m][code].empty]
+            merged_by_country[code] = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+        return write_merged_workbook(self.output_path, merged_by_country)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental File Library sync for the current month(s).")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_S, help="Seconds between polls")
+    parser.add_argument("--months", type=int, default=1, help="Number of months to keep in sync, ending with the current one")
+    parser.add_argument("--countries", default=",".join(COUNTRIES), help="Comma-separated country codes")
+    parser.add_argument("--once", action="store_true", help="Run a single sync and exit")
+    args = parser.parse_args()
+
+    countries = [c.strip().upper() for c in args.countries.split(",") if c.strip()]
+    daemon = SyncDaemon(load_settings(), countries, max(1, args.months), args.interval)
+    if args.once:
+        daemon.sync_once()
+    else:
+        try:
+            daemon.run()
+        except KeyboardInterrupt:
+            daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
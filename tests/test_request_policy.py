@@ -0,0 +1,47 @@
+import threading
+import time
+import unittest
+
+from request_policy import CircuitBreaker, RequestPolicy
+
+
+def _open_breaker(policy):
+    for _ in range(policy.breaker.failure_threshold):
+        policy.breaker.record_failure()
+    time.sleep(policy.breaker.reset_timeout * 2)
+
+
+def _call_with_timeout(func, timeout=5.0):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(func()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return result
+
+
+class ChildPolicyBreakerTest(unittest.TestCase):
+    def test_segments_do_not_wait_on_their_parent_probe(self):
+        # The parent call is the half-open probe; its segments must still run
+        policy = RequestPolicy(sleep=lambda _: None, breaker=CircuitBreaker(1, 0.05))
+        _open_breaker(policy)
+
+        def download():
+            segments = policy.child(2)
+            return [segments.call(lambda i=i: i) for i in range(2)]
+
+        self.assertEqual(_call_with_timeout(lambda: policy.call(download)), [[0, 1]])
+        self.assertIsNone(policy.breaker._opened_at)
+        self.assertFalse(policy.breaker._probing)
+
+    def test_segment_outcomes_count_towards_parent(self):
+        policy = RequestPolicy(max_attempts=2, sleep=lambda _: None, breaker=CircuitBreaker(2, 60.0))
+        segments = policy.child(2)
+        segments.breaker.record_failure()
+        segments.breaker.record_failure()
+        self.assertIsNotNone(policy.breaker._opened_at)
+        segments.breaker.record_success()
+        self.assertIsNone(policy.breaker._opened_at)
+
+
+if __name__ == "__main__":
+    unittest.main()